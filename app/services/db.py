@@ -1,10 +1,22 @@
 # app/services/db.py
+import io
 import os
 import re
+import time
+from functools import lru_cache
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import streamlit as st
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import ArgumentError
+
+try:
+    import connectorx as cx  # optional Arrow-native fast path
+except ImportError:
+    cx = None
 
 # Load local .env only when secrets are not provided (i.e., running locally)
 if not st.secrets:
@@ -25,8 +37,40 @@ if not DATABASE_URL:
     # Use psycopg2 driver
     DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-# Create a single global SQLAlchemy engine
-engine = create_engine(DATABASE_URL, future=True, pool_pre_ping=True)
+# SSL mode: an explicit ?sslmode= in the URL wins; otherwise DB_SSLMODE (default require, Neon needs SSL)
+_URL_HAS_SSLMODE = "sslmode=" in DATABASE_URL
+DB_SSLMODE = os.getenv("DB_SSLMODE", "require")
+
+_CONNECT_ARGS = {"keepalives": 1, "keepalives_idle": 30}
+if not _URL_HAS_SSLMODE:
+    _CONNECT_ARGS["sslmode"] = DB_SSLMODE
+
+# Create a single global SQLAlchemy engine (explicit pool so concurrent sessions share warm connections)
+engine = create_engine(
+    DATABASE_URL,
+    future=True,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20,
+    pool_recycle=1800,   # recycle before Neon/idle proxies drop the socket
+    pool_timeout=10,
+    connect_args=_CONNECT_ARGS,
+)
+
+def _cx_url(url: str) -> str:
+    """
+    connectorx wants a plain postgresql:// URL (no +driver suffix). It opens its
+    own connections, so carry the engine's sslmode in the query string.
+    """
+    url = re.sub(r"^postgres(?:ql)?(?:\+\w+)?://", "postgresql://", url)
+    if "sslmode=" not in url:
+        url += ("&" if "?" in url else "?") + "sslmode=" + DB_SSLMODE
+    return url
+
+_CX_URL = _cx_url(DATABASE_URL)
+
+# Postgres reports server-side (SQL) errors with an "ERROR:" severity prefix
+_PG_SERVER_ERROR_RE = re.compile(r"\bERROR:\s")
 
 # Regex to convert psycopg2-style %(name)s -> SQLAlchemy :name
 _PSYCO_RE = re.compile(r"%\((\w+)\)s")
@@ -36,29 +80,164 @@ def _to_sa_binds(sql: str) -> str:
     Convert %(name)s to :name for SQLAlchemy text() calls.
     If :name already present, leaves as-is.
     """
-    # If it already contains any :name, assume it's fine
-    if ":" in sql and not _PSYCO_RE.search(sql):
+    # Cheap substring test first: no %( means nothing to rewrite
+    if "%(" not in sql:
         return sql
+    return _to_sa_binds_cached(sql)
+
+@lru_cache(maxsize=512)
+def _to_sa_binds_cached(sql: str) -> str:
+    # Predefined queries repeat verbatim, so the rewrite is memoized per string
     return _PSYCO_RE.sub(r":\1", sql)
 
+@lru_cache(maxsize=128)
+def _compiled(sql: str):
+    """
+    One TextClause per distinct SQL string. Predefined queries repeat verbatim,
+    so bind parsing happens once and SQLAlchemy's compiled cache gets stable hits.
+    """
+    return text(sql)
+
+# psycopg2's pyformat paramstyle doubles every % (id % 2 -> id %% 2), which only
+# execute() undoes; COPY and connectorx send the text as-is, so render with "named".
+_LITERAL_DIALECT = postgresql.dialect(paramstyle="named")
+
+def _render_literal(sql: str, params: dict | None) -> str:
+    """
+    Inline :name binds as SQL literals (for drivers that can't take params).
+    Params not referenced by the SQL are ignored.
+    """
+    stmt = _compiled(sql)
+    params = params or {}
+    # Match execute(): a bind without a value is an error, not a NULL literal
+    missing = set(stmt._bindparams) - params.keys()
+    if missing:
+        raise ArgumentError(f"A value is required for bind parameter(s) {', '.join(sorted(missing))}")
+    used = {k: v for k, v in params.items() if k in stmt._bindparams}
+    if used:
+        stmt = stmt.bindparams(**used)
+    return str(stmt.compile(dialect=_LITERAL_DIALECT, compile_kwargs={"literal_binds": True}))
+
+def _prepare(query: str) -> str:
+    sql_clean = query.strip().rstrip(";")  # avoid trailing ; issues
+    return _to_sa_binds(sql_clean)
+
+def _read_arrow_cx(sql_clean: str, params: dict | None) -> pa.Table | None:
+    """
+    connectorx fast path; None when unavailable or on connection/driver errors.
+    Database errors (bad SQL, statement timeouts) are raised, not retried.
+    """
+    if cx is None:
+        return None
+    final_sql = _render_literal(sql_clean, params)  # missing binds raise here, no fallback
+    try:
+        return cx.read_sql(_CX_URL, final_sql, return_type="arrow")
+    except Exception as e:
+        if _PG_SERVER_ERROR_RE.search(str(e)):
+            raise
+        return None  # caller falls back to SQLAlchemy
+
+BULK_ROW_THRESHOLD = 5000
+_LIMIT_RE = re.compile(r"\blimit\s+(\d+)", re.IGNORECASE)
+
+def _wants_bulk(sql: str) -> bool:
+    """No LIMIT (or a LIMIT above the threshold) -> potentially large result."""
+    limits = _LIMIT_RE.findall(sql)
+    return not limits or int(limits[-1]) > BULK_ROW_THRESHOLD
+
+def _read_arrow_copy(sql_clean: str, params: dict | None) -> pa.Table:
+    """Bulk egress via COPY (...) TO STDOUT, parsed by Arrow's CSV reader."""
+    return _copy_arrow(_render_literal(sql_clean, params))
+
+def _copy_arrow(final_sql: str) -> pa.Table:
+    buf = io.BytesIO()
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            # newline before ")" so a trailing -- comment can't swallow it
+            cur.copy_expert(f"COPY ({final_sql}\n) TO STDOUT WITH CSV HEADER", buf)
+    finally:
+        raw.close()  # back to the pool
+    buf.seek(0)
+    return pa_csv.read_csv(buf)
+
+def _try_copy(sql_clean: str, params: dict | None) -> pa.Table | None:
+    """COPY for potentially large results; None (-> regular fetch) if not wanted or it fails."""
+    if not _wants_bulk(sql_clean):
+        return None
+    final_sql = _render_literal(sql_clean, params)  # missing binds raise here, no fallback
+    try:
+        return _copy_arrow(final_sql)
+    except Exception:
+        return None
+
+def run_query_bulk(query: str, params: dict | None = None) -> pd.DataFrame:
+    """
+    Execute SQL through Postgres COPY and return a DataFrame.
+    Much faster than row-by-row DB-API fetches for large forex_bars reads.
+    """
+    return _read_arrow_copy(_prepare(query), params).to_pandas(types_mapper=pd.ArrowDtype)
+
+def run_query_arrow(query: str, params: dict | None = None) -> pa.Table:
+    """
+    Execute SQL and return a pyarrow.Table (no pandas materialization).
+    st.dataframe renders Arrow tables directly.
+    """
+    sql_clean = _prepare(query)
+    tbl = _read_arrow_cx(sql_clean, params)
+    if tbl is not None:
+        return tbl
+    tbl = _try_copy(sql_clean, params)
+    if tbl is not None:
+        return tbl
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, yield_per=10_000)
+        result = conn.execute(_compiled(sql_clean), params or {})
+        names = list(result.keys())
+        columns = [[] for _ in names]
+        for row in result:
+            for col, v in zip(columns, row):
+                col.append(v)
+    # from_arrays keeps duplicate names (e.g. a.close, b.close in a self-join)
+    return pa.Table.from_arrays([pa.array(c) for c in columns], names=names)
+
 def run_query(query: str, params: dict | None = None) -> pd.DataFrame:
     """
-    Execute SQL and return a DataFrame.
+    Execute SQL and return a DataFrame (Arrow-backed columns).
     Accepts either %(name)s (psycopg2) or :name (SQLAlchemy) placeholders.
+    Uses connectorx when installed; otherwise COPY for potentially large results,
+    else SQLAlchemy with a server-side cursor.
     """
-    sql_clean = query.strip().rstrip(";")  # avoid trailing ; issues
-    sql_clean = _to_sa_binds(sql_clean)
+    sql_clean = _prepare(query)
+    tbl = _read_arrow_cx(sql_clean, params)
+    if tbl is None:
+        tbl = _try_copy(sql_clean, params)
+    if tbl is not None:
+        return tbl.to_pandas(types_mapper=pd.ArrowDtype)
     with engine.connect() as conn:
-        df = pd.read_sql(text(sql_clean), conn, params=params or {})
+        # stream_results -> psycopg2 named (server-side) cursor, fetched in batches
+        conn = conn.execution_options(stream_results=True, yield_per=10_000)
+        df = pd.read_sql(_compiled(sql_clean), conn, params=params or {}, dtype_backend="pyarrow")
     return df
 
-def get_min_datetime():
+_DATETIME_RANGE_TTL = 300  # seconds
+
+@lru_cache(maxsize=1)
+def _datetime_range(_bucket: int):
+    # _bucket changes every TTL seconds, which evicts the single cached entry
     with engine.connect() as conn:
-        return conn.execute(text("SELECT MIN(datetime) FROM forex_bars")).scalar()
+        row = conn.execute(text("SELECT MIN(datetime), MAX(datetime) FROM forex_bars")).one()
+    return row[0], row[1]
+
+def get_datetime_range():
+    """(earliest, latest) datetime in forex_bars, cached for a few minutes."""
+    return _datetime_range(int(time.time() // _DATETIME_RANGE_TTL))
+
+def get_min_datetime():
+    return get_datetime_range()[0]
 
 def get_max_datetime():
-    with engine.connect() as conn:
-        return conn.execute(text("SELECT MAX(datetime) FROM forex_bars")).scalar()
+    return get_datetime_range()[1]
 
 if __name__ == "__main__":
     print("Testing DB (SQLAlchemy) ...")
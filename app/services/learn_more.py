@@ -0,0 +1,169 @@
+# app/services/learn_more.py
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from app.services.queries import load_queries
+
+VALIDATED_FILE = os.getenv("VALIDATED_URLS_FILE", "validated_urls.json")
+VALIDATED_TTL = 7 * 24 * 3600  # re-check each URL at most once a week
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Plain English plus words every FX explanation uses (pair, price, trader, ...);
+# they say nothing about which curated page fits.
+_STOPWORDS = {
+    "a", "about", "also", "an", "and", "are", "as", "at", "be", "between", "by", "can",
+    "do", "does", "for", "from", "help", "helps", "how", "if", "in", "into", "is", "it",
+    "its", "last", "less", "more", "most", "no", "not", "of", "on", "or", "over", "per",
+    "s", "so", "than", "that", "the", "their", "then", "there", "these", "they", "this",
+    "those", "to", "use", "used", "uses", "we", "what", "when", "which", "with", "you", "your",
+    "analyst", "analysts", "business", "currency", "eur", "eurusd", "fx", "forex", "market",
+    "mean", "means", "measure", "measures", "pair", "plan", "price", "prices", "pricing",
+    "request", "trade", "trader", "traders", "trading", "usd",
+    # generic trading advice
+    "entries", "entry", "exit", "exits", "follow", "followed", "manage", "risk", "time", "timing",
+}
+_SUFFIXES = ("ations", "ation", "ility", "ities", "ile", "ing", "ies", "es", "ed", "ly", "s")
+
+
+def _stem(t: str) -> str:
+    # Crude suffix strip so volatile/volatility, reversal/reversals etc. meet
+    for suf in _SUFFIXES:
+        if t.endswith(suf) and len(t) - len(suf) >= 3:
+            return t[: -len(suf)]
+    return t
+
+
+def _tokens(text: str) -> list[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _load_curated() -> list[tuple[str, str]]:
+    """(title, url) pairs from the curated registry's learn_more links."""
+    try:
+        entries = load_queries()
+    except Exception:
+        return []
+    out = []
+    for e in entries or []:
+        links = e.get("learn_more")
+        if not links:
+            continue
+        title = f'{e.get("natural_language_question", "")} {e.get("interpretation", "")}'
+        for url in links if isinstance(links, (list, tuple)) else [links]:
+            out.append((title, url))
+    return out
+
+
+CURATED: list[tuple[str, str]] = _load_curated()
+
+
+class _BM25:
+    """Minimal Okapi BM25 over a handful of curated titles."""
+
+    def __init__(self, docs: list[list[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.tfs = [Counter(d) for d in docs]
+        self.lens = [len(d) for d in docs]
+        self.avgdl = (sum(self.lens) / len(docs)) if docs else 0.0
+        df = Counter(t for d in docs for t in set(d))
+        n = len(docs)
+        self.df, self.n = df, n
+        self.idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def scores(self, query: list[str]) -> list[float]:
+        out = []
+        for tf, dl in zip(self.tfs, self.lens):
+            s = 0.0
+            for t in query:
+                f = tf.get(t)
+                if not f:
+                    continue
+                norm = f + self.k1 * (1 - self.b + self.b * dl / (self.avgdl or 1))
+                s += self.idf[t] * f * (self.k1 + 1) / norm
+            out.append(s)
+        return out
+
+
+_INDEX = _BM25([_tokens(title) for title, _ in CURATED])
+
+
+def curated_links(topic: str, k: int = 3, min_terms: int = 2, max_df: float = 0.25) -> list[str]:
+    """
+    Top-k curated URLs for a topic (no network I/O).
+    A page only counts as a hit when it shares at least `min_terms` distinct
+    distinctive terms with the topic (terms found in at most `max_df` of the
+    curated pages); generic words like pip/change/volatility can't carry a match.
+    """
+    query = set(_tokens(topic))
+    if not query or not CURATED:
+        return []
+    distinctive = {t for t in query if _INDEX.df.get(t, 0) <= max(1, max_df * _INDEX.n)}
+    scores = _INDEX.scores(list(distinctive))
+    hits = [
+        (score, url)
+        for score, tf, (_, url) in zip(scores, _INDEX.tfs, CURATED)
+        if sum(1 for t in distinctive if t in tf) >= min_terms
+    ]
+    out = []
+    for _, url in sorted(hits, reverse=True):
+        if len(out) >= k:
+            break
+        if url not in out:
+            out.append(url)
+    return out
+
+
+# --- on-disk cache of URL checks: {url: [ok, checked_at]} ---
+_VALIDATED_LOCK = threading.Lock()
+
+
+def _read_validated() -> dict:
+    try:
+        with open(VALIDATED_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_VALIDATED: dict = _read_validated()
+
+
+def cached_check(url: str) -> bool | None:
+    """Cached result for `url` if checked within VALIDATED_TTL, else None."""
+    with _VALIDATED_LOCK:
+        hit = _VALIDATED.get(url)
+    if hit and time.time() - hit[1] < VALIDATED_TTL:
+        return bool(hit[0])
+    return None
+
+
+def record_check(url: str, ok: bool):
+    """Persist a fresh check result."""
+    with _VALIDATED_LOCK:
+        _VALIDATED[url] = [bool(ok), time.time()]
+        try:
+            with open(VALIDATED_FILE, "w", encoding="utf-8") as f:
+                json.dump(_VALIDATED, f)
+        except OSError:
+            pass  # cache is best-effort
+
+
+def checked_ok(url: str, check, shortcut=None) -> bool:
+    """
+    Return the cached result for `url` if fresh; otherwise run `check(url)`
+    and persist the outcome. A true `shortcut(url)` (e.g. a short-lived host cache)
+    accepts the URL without checking it, so that answer is never persisted.
+    """
+    ok = cached_check(url)
+    if ok is not None:
+        return ok
+    if shortcut is not None and shortcut(url):
+        return True
+    ok = bool(check(url))
+    record_check(url, ok)
+    return ok
@@ -0,0 +1,93 @@
+# app/services/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_FILE = os.getenv("LLM_CACHE_FILE", "llm_cache.sqlite3")
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))  # seconds (1 day)
+
+
+def make_key(model: str, messages, temperature: float) -> str:
+    """Stable sha256 key for an LM Studio request (exact match only)."""
+    blob = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-level response cache: an in-process LRU in front of a SQLite table.
+    Only exact-hash hits are served, so near-duplicate questions (e.g. CPM vs CPC)
+    never get each other's answers.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, maxsize: int = 256):
+        self.path = path
+        self.maxsize = maxsize
+        self._mem: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        try:
+            self._execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, ts REAL)"
+            )
+        except sqlite3.Error:
+            pass  # fall back to the in-memory layer only
+
+    def _execute(self, sql: str, args: tuple = ()):
+        # One short-lived connection per call keeps this safe across Streamlit threads
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:  # commits on success
+                return conn.execute(sql, args).fetchone()
+        finally:
+            conn.close()
+
+    def _remember(self, key: str, value: str, expires: float):
+        self._mem[key] = (value, expires)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.maxsize:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit:
+                value, expires = hit
+                if expires > now:
+                    self._mem.move_to_end(key)
+                    return value
+                del self._mem[key]
+        try:
+            row = self._execute("SELECT value, ts FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error:
+            return None
+        if not row or row[1] <= now:
+            return None
+        with self._lock:
+            self._remember(key, row[0], row[1])
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float = DEFAULT_TTL):
+        """Store value; `ts` holds the expiry timestamp."""
+        expires = time.time() + ttl
+        with self._lock:
+            self._remember(key, value, expires)
+        try:
+            self._execute(
+                "INSERT OR REPLACE INTO cache (key, value, ts) VALUES (?, ?, ?)",
+                (key, value, expires),
+            )
+        except sqlite3.Error:
+            pass  # cache is best-effort; never break the request
+
+
+# Shared instance
+cache = LLMCache()
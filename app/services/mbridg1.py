@@ -1,10 +1,22 @@
 import os
 import requests
 import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 QWEN_API_URL = os.getenv("QWEN_API_URL", "http://localhost:1234/v1/chat/completions")
 QWEN_MODEL   = os.getenv("QWEN_MODEL",   "qwen/qwen2.5-vl-7b")
 
+# One pooled HTTP session for LM Studio (keep-alive reuses sockets)
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
 # 👇 Schema description that will be injected into Qwen
 SCHEMA_DESCRIPTION = """
 You are a helpful assistant that generates ONLY SQL queries for PostgreSQL.
@@ -39,9 +51,11 @@ Rules:
 """
 
 # --- helper to strip code fences and clean ---
+_FENCE_RE = re.compile(r"^```(?:sql)?\s*([\s\S]*?)\s*```$", re.IGNORECASE)
+
 def _strip_fences(sql_text: str) -> str:
     sql_text = sql_text.strip()
-    m = re.match(r"^```(?:sql)?\s*([\s\S]*?)\s*```$", sql_text, flags=re.IGNORECASE)
+    m = _FENCE_RE.match(sql_text)
     return (m.group(1) if m else sql_text).strip()
 
 def _clean(sql_text: str) -> str:
@@ -60,7 +74,7 @@ def ask_qwen(user_question: str) -> str:
         "temperature": 0.2,
         "max_tokens": 500,
     }
-    r = requests.post(QWEN_API_URL, json=payload, timeout=60)
+    r = _SESSION.post(QWEN_API_URL, json=payload, timeout=60)
     r.raise_for_status()
     data = r.json()
     sql_raw = data["choices"][0]["message"]["content"]
@@ -68,7 +82,7 @@ def ask_qwen(user_question: str) -> str:
 
 def health_check() -> bool:
     try:
-        r = requests.get(QWEN_API_URL.replace("/chat/completions", "/models"), timeout=5)
+        r = _SESSION.get(QWEN_API_URL.replace("/chat/completions", "/models"), timeout=5)
         r.raise_for_status()
         return True
     except Exception:
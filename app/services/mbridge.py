@@ -1,12 +1,38 @@
 import os
+import json
 import requests
 import re
+import time
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from app.services.qlog import append_unanswered
+from app.services.llm_cache import cache as _LLM_CACHE, make_key
+from app.services.learn_more import checked_ok, curated_links
+from app.services.sql_guard import safe_select
 
 
 QWEN_API_URL = os.getenv("QWEN_API_URL", "http://localhost:1234/v1/chat/completions")
 QWEN_MODEL   = os.getenv("QWEN_MODEL",   "qwen/qwen2.5-vl-7b")
 
+# One pooled HTTP session for LM Studio (keep-alive reuses sockets)
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# Separate pool for learn-more link checks: no retries, so a slow site costs
+# one timeout per request instead of three
+_LINK_SESSION = requests.Session()
+_LINK_ADAPTER = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0)
+_LINK_SESSION.mount("http://", _LINK_ADAPTER)
+_LINK_SESSION.mount("https://", _LINK_ADAPTER)
+
 # System prompt ONLY for SQL generation
 SCHEMA_DESCRIPTION = """
 You are a helpful assistant that generates ONLY SQL queries for PostgreSQL.
@@ -37,11 +63,54 @@ Rules:
 7. Prefer aliases for clarity if needed.
 """
 
+# System prompt for SQL + business interpretation in one round-trip
+BUNDLE_DESCRIPTION = """
+You are an expert PostgreSQL SQL generator for FX analytics. Return output in the EXACT format below:
+
+```sql
+SELECT ... -- a single valid PostgreSQL SELECT for table forex_bars ONLY
+```
+Interpretation: <3-6 concise business sentences on ONE line, no SQL language>
+
+The database has one table called `forex_bars` with the following columns:
+- datetime (timestamp): the time of the forex bar
+- open (float): opening price
+- high (float): highest price
+- low (float): lowest price
+- close (float): closing price
+- volume (float): trading volume
+- pip_hl (float): pip difference (high - low)
+- pip_oc (float): pip difference (close - open)
+- confidence_score (float): numeric confidence value
+- confidence_tag (text): category label
+- id (int)
+- symbol (text)
+
+Rules:
+1. Use only these columns. Do not invent new ones.
+2. Always include a filter:
+   WHERE CAST(datetime AS date) BETWEEN :start_date AND :end_date
+   (unless the user explicitly provides their own filter).
+3. Use ONLY this table (forex_bars).
+4. The interpretation explains what the request means for a trader or pricing analyst.
+5. Do NOT include any text before or after the two required parts.
+"""
+
 # helpers 
 
+# Precompiled patterns (hot path: every LM Studio response)
+_FENCE_RE = re.compile(r"^```(?:sql)?\s*([\s\S]*?)\s*```$", re.IGNORECASE)
+_URL_RE = re.compile(r"(https?://[^\s\)\]]+)", re.IGNORECASE)
+_FENCED_BLOCK_RE = re.compile(r"```(?:sql)?\s*[\s\S]*?```", re.IGNORECASE)
+_SQL_BLOCK_RE = re.compile(r"```sql\s*(.*?)```", re.IGNORECASE | re.DOTALL)
+_INTERPRETATION_RE = re.compile(r"^\s*Interpretation:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+# Terminator must be followed by whitespace: a "." at the end of the text so far may be
+# a decimal split across tokens ("1" + "." + "5 pips")
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s)")
+
 def _strip_fences(sql_text: str) -> str:
     sql_text = sql_text.strip()
-    m = re.match(r"^```(?:sql)?\s*([\s\S]*?)\s*```$", sql_text, flags=re.IGNORECASE)
+    m = _FENCE_RE.match(sql_text)
     return (m.group(1) if m else sql_text).strip()
 
 def _clean(sql_text: str) -> str:
@@ -49,17 +118,104 @@ def _clean(sql_text: str) -> str:
     sql = sql.strip().rstrip(";") + ";"  # ensure trailing ;
     return sql
 
-def _post(messages, temperature=0.3, max_tokens=512):
+def _sql_stop(text: str) -> bool:
+    """Stop once the ```sql block is closed, or as soon as the reply is clearly prose."""
+    s = text.lstrip()
+    if not s:
+        return False
+    if s.startswith("```"):
+        return s.find("```", 3) != -1
+    head = s[:6].lower()
+    # Bare SQL (no fences) is still accepted by _clean
+    return not any(k.startswith(head) or head.startswith(k) for k in ("```", "select", "with"))
+
+def _sentences_stop(limit: int):
+    """Stop after `limit` sentence terminators."""
+    return lambda text: len(_SENTENCE_END_RE.findall(text)) >= limit
+
+def _stream(payload: dict, stop) -> str:
+    """
+    Stream an SSE completion, accumulating delta.content until `stop(text)` is true.
+    Breaking out closes the response mid-stream, which aborts generation in LM Studio.
+    """
+    parts = []
+    with _SESSION.post(QWEN_API_URL, json={**payload, "stream": True}, timeout=60, stream=True) as r:
+        r.raise_for_status()
+        # SSE is always UTF-8; requests would guess ISO-8859-1 for a charset-less text/event-stream
+        r.encoding = "utf-8"
+        for line in r.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            choices = chunk.get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                parts.append(delta)
+                if stop("".join(parts)):
+                    break
+    return "".join(parts)
+
+def _cache_store(messages, temperature, content: str):
+    _LLM_CACHE.set(make_key(QWEN_MODEL, messages, temperature), content)
+
+def _post(messages, temperature=0.3, max_tokens=512, use_cache=True, stop=None, store=True):
+    # Identical (model, messages, temperature) requests are served from the cache.
+    # store=False: caller validates the reply first and stores it via _cache_store.
+    key = make_key(QWEN_MODEL, messages, temperature)
+    if use_cache:
+        cached = _LLM_CACHE.get(key)
+        if cached is not None:
+            return cached
+
     payload = {
         "model": QWEN_MODEL,
         "messages": messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
-    r = requests.post(QWEN_API_URL, json=payload, timeout=60)
-    r.raise_for_status()
-    data = r.json()
-    return data["choices"][0]["message"]["content"]
+    if stop is not None:
+        content = _stream(payload, stop)
+    else:
+        r = _SESSION.post(QWEN_API_URL, json=payload, timeout=60)
+        r.raise_for_status()
+        data = r.json()
+        content = data["choices"][0]["message"]["content"]
+    if use_cache and store and content:
+        _LLM_CACHE.set(key, content)
+    return content
+
+def _interpret_prompt(question: str) -> str:
+    return (
+        "Explain in 3–6 sentences what the following FX analytics request means in business terms. "
+        "Avoid SQL language. Be specific, action-oriented, and useful for a trader or pricing analyst.\n\n"
+        f"Request:\n{question}"
+    )
+
+def _links_prompt(topic: str) -> str:
+    return (
+        "Give 2–3 credible, directly relevant webpages (full URLs) where someone can learn more about "
+        f"this topic:\n\n{topic}\n\n"
+        "Rules:\n"
+        "- ONLY output raw URLs, one per line (no text, no markdown).\n"
+        "- Prefer authoritative sources (captrader,fxstreet,babypips,/trendspider).\n"
+        "- Links must be directly about the topic, not generic homepages."
+    )
+
+def _bad_sql(sql: str) -> bool:
+    # --- sanity checks on the returned SQL ---
+    return (
+        not sql
+        or sql.strip().lower() in {"", "none;", "null;"}
+        or "select" not in sql.lower()  # must be an SQL SELECT
+        or "forex_bars" not in sql.lower()  # must use our table
+        or safe_select(sql) is None  # parsed: single SELECT, forex_bars, known columns only
+    )
 
 # public API 
 def ask_qwen(user_question: str) -> str:
@@ -68,29 +224,22 @@ def ask_qwen(user_question: str) -> str:
     If nothing useful is returned (empty, junk, or invalid),
     log it as unanswered so we can later add it to Predefined Queries.
     """
+    messages = [
+        {"role": "system", "content": SCHEMA_DESCRIPTION},
+        {"role": "user",   "content": user_question},
+    ]
     try:
-        content = _post(
-            [
-                {"role": "system", "content": SCHEMA_DESCRIPTION},
-                {"role": "user",   "content": user_question},
-            ],
-            temperature=0.2,
-            max_tokens=500,
-        )
-        sql = _clean(content)
-
-        # --- sanity checks on the returned SQL ---
-        bad_sql = (
-            not sql
-            or sql.strip().lower() in {"", "none;", "null;"}
-            or "select" not in sql.lower()  # must be an SQL SELECT
-            or "forex_bars" not in sql.lower()  # must use our table
-        )
-
-        if bad_sql:
+        content = _post(messages, temperature=0.2, max_tokens=500, stop=_sql_stop, store=False)
+        # Drop anything streamed after the closing fence
+        m = _FENCED_BLOCK_RE.search(content)
+        sql = _clean(m.group(0) if m else content)
+
+        if _bad_sql(sql):
             append_unanswered(user_question, failed_sql=sql or "")
             return ""   # signals UI to show "Atlas shrugged"
 
+        # Only usable SQL is cached, so a bad reply (e.g. prose aborted mid-stream) is retried
+        _cache_store(messages, 0.2, content)
         return sql
 
     except Exception as e:
@@ -99,68 +248,155 @@ def ask_qwen(user_question: str) -> str:
         return ""
 
 
+def ask_qwen_bundle(user_question: str) -> dict:
+    """
+    One LM Studio call for both SQL and business interpretation.
+    Returns {"sql": str, "interpretation": str}; "sql" is "" when unusable
+    (and the question is logged as unanswered, same as ask_qwen).
+    """
+    messages = [
+        {"role": "system", "content": BUNDLE_DESCRIPTION},
+        {"role": "user",   "content": user_question},
+    ]
+    try:
+        content = _post(messages, temperature=0.2, max_tokens=800, store=False)
+    except Exception as e:
+        append_unanswered(user_question, failed_sql=f"ERROR: {e}")
+        return {"sql": "", "interpretation": ""}
+
+    m = _SQL_BLOCK_RE.search(content)
+    if m:
+        sql = _clean(m.group(1))
+    else:
+        # fallback: any fenced block
+        m = _FENCED_BLOCK_RE.search(content)
+        sql = _clean(m.group(0)) if m else ""
+    i_match = _INTERPRETATION_RE.search(content)
+    interpretation = i_match.group(1).strip() if i_match else ""
+
+    if _bad_sql(sql):
+        append_unanswered(user_question, failed_sql=sql or "")
+        sql = ""
+    else:
+        _cache_store(messages, 0.2, content)
+    return {"sql": sql, "interpretation": interpretation}
+
+
 def interpret_business(question: str) -> str:
     """
     Business-level interpretation (for Atlas mode only).
     Keep it concise and non-technical.
     """
-    prompt = (
-        "Explain in 3–6 sentences what the following FX analytics request means in business terms. "
-        "Avoid SQL language. Be specific, action-oriented, and useful for a trader or pricing analyst.\n\n"
-        f"Request:\n{question}"
+    content = _post(
+        [{"role": "user", "content": _interpret_prompt(question)}],
+        temperature=0.4,
+        max_tokens=300,
+        stop=_sentences_stop(6),
     )
-    content = _post([{"role": "user", "content": prompt}], temperature=0.4, max_tokens=300)
     return content.strip()
 
 def _extract_urls(text: str):
     # Accept plain and markdown formats
-    url_re = re.compile(r"(https?://[^\s\)\]]+)", flags=re.IGNORECASE)
-    return [m.group(1).rstrip(".,);]") for m in url_re.finditer(text)]
+    return [m.group(1).rstrip(".,);]") for m in _URL_RE.finditer(text)]
+
+# Hosts the link prompt asks for; a fresh OK on the host skips the per-URL HEAD
+_TRUSTED_HOSTS = ("captrader.com", "fxstreet.com", "babypips.com", "trendspider.com")
+_DOMAIN_TTL = 3600  # seconds
+_DOMAIN_OK: dict[str, tuple[bool, float]] = {}
+
+def _trusted_host(url: str) -> str | None:
+    host = urlsplit(url).netloc.lower().split(":")[0]
+    for h in _TRUSTED_HOSTS:
+        if host == h or host.endswith("." + h):
+            return h
+    return None
+
+def _domain_ok(host: str | None) -> bool:
+    hit = _DOMAIN_OK.get(host) if host else None
+    return bool(hit and hit[0] and time.time() - hit[1] < _DOMAIN_TTL)
+
+def _host_recently_ok(url: str) -> bool:
+    # In-memory only: callers must not persist this as a per-URL result
+    return _domain_ok(_trusted_host(url))
+
+def _html_ok(resp) -> bool:
+    ct = resp.headers.get("Content-Type", "").lower()
+    return (resp.status_code < 400) and ("text/html" in ct or "application/xhtml+xml" in ct)
 
 def _http_ok(url: str) -> bool:
+    """Real per-URL check; a success also marks a trusted host OK for _DOMAIN_TTL."""
+    host = _trusted_host(url)
     try:
         headers = {"User-Agent": "FXLens/1.0 (+https://local)"}
-        # Try HEAD first; some sites block HEAD -> fallback to GET
-        resp = requests.head(url, allow_redirects=True, timeout=6, headers=headers)
-        if resp.status_code < 400 and "text/html" in resp.headers.get("Content-Type", "").lower():
-            return True
-        resp = requests.get(url, allow_redirects=True, timeout=8, headers=headers, stream=True)
-        ct = resp.headers.get("Content-Type", "").lower()
-        return (resp.status_code < 400) and ("text/html" in ct or "application/xhtml+xml" in ct)
+        resp = _LINK_SESSION.head(url, allow_redirects=True, timeout=6, headers=headers)
+        try:
+            ok, blocked = _html_ok(resp), resp.status_code in (403, 405)
+        finally:
+            resp.close()
+        if blocked:
+            # Some sites block HEAD -> fallback to GET; stream=True reads headers only
+            resp = _LINK_SESSION.get(url, allow_redirects=True, timeout=8, headers=headers, stream=True)
+            try:
+                ok = _html_ok(resp)
+            finally:
+                resp.close()
     except Exception:
         return False
+    if ok and host:
+        _DOMAIN_OK[host] = (True, time.time())
+    return ok
 
 def suggest_learn_more_links(topic: str, max_links: int = 3) -> list[str]:
     """
-    Use LM Studio (Qwen) to suggest 1–3 authoritative URLs for learning more.
-    We then validate the URLs actually resolve (HTTP < 400) before returning.
+    Serve 1–3 learn-more URLs from the curated registry when the topic matches.
+    Otherwise ask LM Studio (Qwen) for suggestions and validate the URLs actually
+    resolve (HTTP < 400); check results are cached on disk for a week.
     """
-    prompt = (
-        "Give 2–3 credible, directly relevant webpages (full URLs) where someone can learn more about "
-        f"this topic:\n\n{topic}\n\n"
-        "Rules:\n"
-        "- ONLY output raw URLs, one per line (no text, no markdown).\n"
-        "- Prefer authoritative sources (captrader,fxstreet,babypips,/trendspider).\n"
-        "- Links must be directly about the topic, not generic homepages."
-    )
-    raw = _post([{"role": "user", "content": prompt}], temperature=0.2, max_tokens=220)
-    candidates = _extract_urls(raw)
-    # Deduplicate and validate
-    seen = set()
-    valid = []
-    for url in candidates:
-        if url in seen:
-            continue
-        seen.add(url)
-        if _http_ok(url):
-            valid.append(url)
-        if len(valid) >= max_links:
-            break
-    return valid
+    curated = curated_links(topic, k=max_links)
+    if curated:
+        return curated
+
+    raw = _post([{"role": "user", "content": _links_prompt(topic)}], temperature=0.2, max_tokens=220)
+    # Deduplicate (keeping order), then validate in parallel on the link-check session
+    unique = list(dict.fromkeys(_extract_urls(raw)))
+    if not unique:
+        return []
+    ok = set()
+    ex = ThreadPoolExecutor(max_workers=min(8, len(unique)))
+    try:
+        futures = {ex.submit(checked_ok, u, _http_ok, _host_recently_ok): u for u in unique}
+        for fut in as_completed(futures):
+            if fut.result():
+                ok.add(futures[fut])
+            if len(ok) >= max_links:
+                break
+    finally:
+        # Don't join: checks still in flight finish in the background
+        ex.shutdown(wait=False, cancel_futures=True)
+    # Preserve the model's ordering
+    return [u for u in unique if u in ok][:max_links]
+
+def warmup():
+    """
+    Tiny 1-token completion so the model is resident and the pooled session
+    holds a live keep-alive socket before the first real question.
+    """
+    try:
+        _SESSION.post(
+            QWEN_API_URL,
+            json={
+                "model": QWEN_MODEL,
+                "messages": [{"role": "user", "content": "ping"}],
+                "max_tokens": 1,
+            },
+            timeout=10,
+        ).close()
+    except Exception:
+        pass
 
 def health_check() -> bool:
     try:
-        r = requests.get(QWEN_API_URL.replace("/chat/completions", "/models"), timeout=5)
+        r = _SESSION.get(QWEN_API_URL.replace("/chat/completions", "/models"), timeout=5)
         r.raise_for_status()
         return True
     except Exception:
@@ -0,0 +1,146 @@
+# app/services/mbridge_async.py
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.services.learn_more import cached_check, curated_links, record_check
+from app.services.llm_cache import cache as _LLM_CACHE, make_key
+from app.services.mbridge import (
+    QWEN_API_URL,
+    QWEN_MODEL,
+    _DOMAIN_OK,
+    _extract_urls,
+    _host_recently_ok,
+    _html_ok,
+    _interpret_prompt,
+    _links_prompt,
+    _sentences_stop,
+    _trusted_host,
+)
+
+# Keep-alive pool limits for one asyncio.run(); a client can't outlive its event loop,
+# so each run opens its own and every coroutine in the gather shares it.
+_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=30)
+_HEADERS = {"User-Agent": "FXLens/1.0 (+https://local)"}
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(limits=_LIMITS, timeout=60, follow_redirects=True)
+
+
+async def _stream(client: httpx.AsyncClient, payload: dict, stop) -> str:
+    parts = []
+    async with client.stream("POST", QWEN_API_URL, json={**payload, "stream": True}) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            choices = chunk.get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                parts.append(delta)
+                if stop("".join(parts)):
+                    break  # leaving the context closes the stream -> aborts generation
+    return "".join(parts)
+
+
+async def _post(client: httpx.AsyncClient, messages, temperature=0.3, max_tokens=512, stop=None):
+    # Shares the on-disk cache with the sync mbridge._post
+    key = make_key(QWEN_MODEL, messages, temperature)
+    cached = _LLM_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    payload = {
+        "model": QWEN_MODEL,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    if stop is not None:
+        content = await _stream(client, payload, stop)
+    else:
+        r = await client.post(QWEN_API_URL, json=payload)
+        r.raise_for_status()
+        content = r.json()["choices"][0]["message"]["content"]
+    if content:
+        _LLM_CACHE.set(key, content)
+    return content
+
+
+async def interpret_business(client: httpx.AsyncClient, question: str) -> str:
+    """Async port of mbridge.interpret_business."""
+    content = await _post(
+        client,
+        [{"role": "user", "content": _interpret_prompt(question)}],
+        temperature=0.4,
+        max_tokens=300,
+        stop=_sentences_stop(6),
+    )
+    return content.strip()
+
+
+async def _http_ok(client: httpx.AsyncClient, url: str) -> bool:
+    # Same HEAD-first policy and host cache update as mbridge._http_ok
+    host = _trusted_host(url)
+    try:
+        resp = await client.head(url, timeout=6, headers=_HEADERS)
+        ok = _html_ok(resp)
+        if resp.status_code in (403, 405):
+            # Some sites block HEAD -> fallback to GET (headers only)
+            async with client.stream("GET", url, timeout=8, headers=_HEADERS) as resp:
+                ok = _html_ok(resp)
+    except Exception:
+        return False
+    if ok and host:
+        _DOMAIN_OK[host] = (True, time.time())
+    return ok
+
+
+async def _checked_ok(client: httpx.AsyncClient, url: str) -> bool:
+    # Mirrors learn_more.checked_ok: host-cache shortcuts are never persisted
+    ok = cached_check(url)
+    if ok is not None:
+        return ok
+    if _host_recently_ok(url):
+        return True
+    ok = await _http_ok(client, url)
+    record_check(url, ok)
+    return ok
+
+
+async def suggest_learn_more_links(client: httpx.AsyncClient, topic: str, max_links: int = 3) -> list[str]:
+    """Async port of mbridge.suggest_learn_more_links (curated first, then LLM + checks)."""
+    curated = curated_links(topic, k=max_links)
+    if curated:
+        return curated
+
+    raw = await _post(client, [{"role": "user", "content": _links_prompt(topic)}], temperature=0.2, max_tokens=220)
+    unique = list(dict.fromkeys(_extract_urls(raw)))
+    results = await asyncio.gather(*(_checked_ok(client, u) for u in unique))
+    return [u for u, ok in zip(unique, results) if ok][:max_links]
+
+
+async def interpret_and_links(question: str, interpretation: str = "") -> tuple[str, list[str]]:
+    """
+    Business interpretation + learn-more links for the Atlas panel.
+    When no interpretation is supplied, both LLM calls run concurrently
+    (links are then keyed on the question instead of the interpretation).
+    """
+    async with _new_client() as client:
+        if interpretation:
+            return interpretation, await suggest_learn_more_links(client, interpretation)
+        explanation, links = await asyncio.gather(
+            interpret_business(client, question),
+            suggest_learn_more_links(client, question),
+        )
+        return explanation, links
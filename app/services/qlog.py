@@ -1,19 +1,27 @@
 import os
 import csv
+import threading
 from datetime import datetime
 
 LOG_FILE = "unanswered_queries.csv"
 
+# Header state is checked once at import; the lock keeps concurrent
+# Streamlit sessions from writing the header twice or interleaving rows.
+_LOG_LOCK = threading.Lock()
+_HEADER_WRITTEN = os.path.isfile(LOG_FILE) and os.path.getsize(LOG_FILE) > 0
+
 def append_unanswered(question: str, failed_sql: str = None):
     """
     Append an unanswered question (and optional failed SQL) to a CSV log.
     """
-    file_exists = os.path.isfile(LOG_FILE)
-    with open(LOG_FILE, mode="a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["timestamp", "question", "failed_sql"])
-        writer.writerow([datetime.utcnow().isoformat(), question, failed_sql or ""])
+    global _HEADER_WRITTEN
+    with _LOG_LOCK:
+        with open(LOG_FILE, mode="a", newline="", encoding="utf-8", buffering=8192) as f:
+            writer = csv.writer(f)
+            if not _HEADER_WRITTEN:
+                writer.writerow(["timestamp", "question", "failed_sql"])
+                _HEADER_WRITTEN = True
+            writer.writerow([datetime.utcnow().isoformat(), question, failed_sql or ""])
 
 # Alias for backward compatibility
 log_failed_query = append_unanswered
@@ -1,7 +1,19 @@
+import os
+from functools import lru_cache
+
 import yaml
 
+try:
+    from yaml import CSafeLoader as _Loader  # libyaml-backed, much faster
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+@lru_cache(maxsize=1)
+def _load(yaml_path: str, mtime: float):
+    # mtime is part of the cache key, so edits to the file trigger a re-parse
+    with open(yaml_path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=_Loader)
+
 def load_queries(yaml_path="queries_registry.yml"):
     """Load all queries from the YAML registry."""
-    with open(yaml_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-    return data
+    return _load(yaml_path, os.path.getmtime(yaml_path))
@@ -0,0 +1,55 @@
+# app/services/sql_guard.py
+from functools import lru_cache
+
+import sqlglot
+from sqlglot import exp
+
+ALLOWED_TABLE = "forex_bars"
+
+# Mirrors the column list in mbridge.SCHEMA_DESCRIPTION
+ALLOWED_COLUMNS = {
+    "datetime", "open", "high", "low", "close", "volume",
+    "pip_hl", "pip_oc", "confidence_score", "confidence_tag", "id", "symbol",
+}
+
+
+@lru_cache(maxsize=256)
+def _parse(sql: str):
+    """Parsed AST per SQL string; None when sqlglot can't parse it (or finds >1 statement)."""
+    try:
+        statements = sqlglot.parse(sql, read="postgres")
+    except sqlglot.errors.SqlglotError:  # ParseError, TokenError (e.g. unterminated string), ...
+        return None
+    statements = [s for s in statements if s is not None]
+    return statements[0] if len(statements) == 1 else None
+
+
+def safe_select(sql: str) -> str | None:
+    """
+    Return `sql` unchanged if it is a single read-only SELECT over forex_bars
+    using only known columns (plus its own aliases / CTE names); otherwise None.
+    Runs locally, so bad LLM output never costs a Postgres round-trip.
+    """
+    tree = _parse(sql.strip())
+    if tree is None or not isinstance(tree, (exp.Select, exp.Union)):
+        return None
+    # No writes/DDL anywhere in the tree (e.g. data-modifying CTEs)
+    if any(tree.find_all(exp.Insert, exp.Update, exp.Delete, exp.Drop, exp.Create, exp.Command)):
+        return None
+
+    ctes = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+    for table in tree.find_all(exp.Table):
+        name = table.name.lower()
+        if name != ALLOWED_TABLE and name not in ctes:
+            return None
+
+    # Names the query defines itself: select aliases, CTE/subquery column aliases, table aliases
+    defined = {a.alias.lower() for a in tree.find_all(exp.Alias) if a.alias}
+    for ta in tree.find_all(exp.TableAlias):
+        defined.add(ta.name.lower())
+        defined.update(c.name.lower() for c in ta.columns)
+    allowed = ALLOWED_COLUMNS | defined
+    for col in tree.find_all(exp.Column):
+        if col.name and col.name.lower() not in allowed:
+            return None
+    return sql
@@ -0,0 +1,41 @@
+# app/services/test_learn_more.py
+import importlib
+import os
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+@pytest.fixture
+def learn_more(monkeypatch, tmp_path):
+    # The registry path is relative to the repo root (how Streamlit is launched)
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.setenv("VALIDATED_URLS_FILE", str(tmp_path / "validated_urls.json"))
+    from app.services import learn_more
+    return importlib.reload(learn_more)
+
+
+def test_registry_questions_hit_their_own_link(learn_more):
+    from app.services.queries import load_queries
+    for entry in load_queries():
+        assert entry["learn_more"] in learn_more.curated_links(entry["natural_language_question"])
+
+
+@pytest.mark.parametrize("topic", [
+    "What is the RSI of the pair?",
+    "correlation between EUR and JPY interest rate differentials",
+    "The RSI measures the momentum of the pair's price. Traders use overbought and "
+    "oversold levels to time entries and manage risk for the currency pair.",
+])
+def test_off_topic_misses(learn_more, topic):
+    assert learn_more.curated_links(topic) == []
+
+
+def test_shortcut_result_is_not_persisted(learn_more):
+    url = "https://www.babypips.com/made-up-page"
+    assert learn_more.checked_ok(url, check=lambda u: False, shortcut=lambda u: True)
+    assert learn_more.cached_check(url) is None
+    # A real check is persisted
+    assert not learn_more.checked_ok(url, check=lambda u: False)
+    assert learn_more.cached_check(url) is False
@@ -0,0 +1,45 @@
+# app/services/test_sql_guard.py
+import os
+import re
+
+import pytest
+
+from app.services.sql_guard import safe_select
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def test_registry_sql_passes(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    from app.services.queries import load_queries
+    for entry in load_queries():
+        # Registry uses psycopg %(name)s binds; the LLM path produces :name
+        sql = re.sub(r"%\((\w+)\)s", r":\1", entry["sql"]).strip().rstrip(";")
+        assert safe_select(sql) == sql, entry["natural_language_question"]
+
+
+@pytest.mark.parametrize("sql", [
+    # malformed: unterminated string (TokenError), unbalanced paren (ParseError)
+    "SELECT close FROM forex_bars WHERE symbol = 'EUR;",
+    "SELECT (close FROM forex_bars",
+    # other tables
+    "SELECT * FROM users",
+    "SELECT f.close FROM forex_bars f JOIN pg_user u ON u.usesysid = f.id",
+    # writes, including inside a CTE
+    "DELETE FROM forex_bars",
+    "WITH d AS (DELETE FROM forex_bars RETURNING *) SELECT * FROM d",
+    # unknown column
+    "SELECT foo FROM forex_bars",
+    # more than one statement
+    "SELECT close FROM forex_bars; DROP TABLE forex_bars",
+])
+def test_rejected(sql):
+    assert safe_select(sql) is None
+
+
+def test_own_aliases_and_ctes_allowed():
+    sql = (
+        "WITH daily AS (SELECT date_trunc('day', datetime) AS day, max(high) - min(low) AS rng "
+        "FROM forex_bars GROUP BY 1) SELECT day, rng FROM daily ORDER BY rng DESC LIMIT 5"
+    )
+    assert safe_select(sql) == sql
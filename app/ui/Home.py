@@ -1,18 +1,30 @@
 # app/ui/Home.py
+import asyncio
 import streamlit as st
+import pyarrow as pa
 from datetime import datetime, timedelta
-from app.services.db import run_query
-from app.services.mbridge import (
-    ask_qwen,
-    interpret_business,
-    suggest_learn_more_links,
-    health_check,
-)
+from app.services.db import run_query_arrow
+from app.services.mbridge import ask_qwen_bundle, health_check, warmup
+from app.services.mbridge_async import interpret_and_links
 from app.services.queries import load_queries
 from app.services.qlog import append_unanswered   # <-- added
 
 # Load predefined queries (expects keys including interpretation, learn_more)
-queries = load_queries()
+@st.cache_resource
+def _load_queries():
+    # YAML registry is static per process
+    return load_queries()
+
+queries = _load_queries()
+_BY_NLQ = {}
+for _q in queries:
+    _BY_NLQ.setdefault(_q["natural_language_question"], _q)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_query(sql: str, params_tuple: tuple) -> pa.Table:
+    # Re-renders with unchanged SQL + params skip the DB round-trip;
+    # Arrow goes straight to st.dataframe without a pandas pass
+    return run_query_arrow(sql, params=dict(params_tuple))
 
 st.title("FXLens")
 
@@ -59,15 +71,15 @@ if mode == "FXLens Insights":
     choice = st.selectbox("Select a question", qlist)
 
     if st.button("Ask FXLens"):
-        selected = next(q for q in queries if q["natural_language_question"] == choice)
+        selected = _BY_NLQ[choice]
         sql = selected["sql"]
         interpretation = selected.get("interpretation") or selected.get("business_interpretation") or "—"
         learn_more = selected.get("learn_more")
 
         st.write("Results:")
         try:
-            df = run_query(sql, params=params)
-            st.dataframe(df)
+            tbl = _cached_query(sql, tuple(sorted(params.items())))
+            st.dataframe(tbl)
 
             # YAML interpretation (business level)
             if interpretation and interpretation.strip() != "—":
@@ -93,7 +105,9 @@ elif mode == "Ask Atlas":
 
     if st.button("Ask Atlas"):
         with st.spinner("Atlas is thinking..."):
-            sql = ask_qwen(user_question)
+            # SQL + business interpretation in one LM Studio round-trip
+            bundle = ask_qwen_bundle(user_question)
+        sql = bundle["sql"]
 
         # Treat empty/invalid SQL as unanswered and log it
         if not sql or not str(sql).strip() or str(sql).strip().lower() in {"none;", "null;"}:
@@ -106,15 +120,17 @@ elif mode == "Ask Atlas":
         else:
             st.write("Results:")
             try:
-                df = run_query(sql, params=params)
-                st.dataframe(df)
-
-                # Business interpretation (Qwen, not SQL explanation)
-                explanation = interpret_business(user_question)
+                tbl = _cached_query(sql, tuple(sorted(params.items())))
+                st.dataframe(tbl)
+
+                # Business interpretation (Qwen, not SQL explanation) + learn-more links;
+                # if the bundle lacked an interpretation, both calls run concurrently
+                explanation, links = asyncio.run(
+                    interpret_and_links(user_question, bundle["interpretation"])
+                )
                 st.markdown(f"**Business interpretation:** {explanation}")
 
-                # Learn more via LM Studio suggestions (validated)
-                links = suggest_learn_more_links(explanation or user_question)
+                # Learn more: curated registry first, else LM Studio suggestions (validated)
                 if links:
                     st.markdown("**Learn more:**")
                     for u in links:
@@ -128,3 +144,11 @@ elif mode == "Ask Atlas":
                         "I’ll run this query manually and, if the data supports it, "
                         "I'll add it to the FXLens Insights, so it’s available next time."
                  )
+
+# Warm LM Studio once per process (model load + keep-alive socket)
+@st.cache_resource(show_spinner=False)
+def _warm():
+    warmup()
+    return True
+
+_warm()
@@ -1,13 +1,28 @@
 # app/ui/Home.py
 # app/ui/Home.py
 import streamlit as st
+import pyarrow as pa
 from datetime import datetime, timedelta
-from app.services.db import run_query
+from app.services.db import run_query_arrow
 from app.services.mbridge import ask_qwen, health_check
 from app.services.queries import load_queries
 
 # Load predefined queries
-queries = load_queries()
+@st.cache_resource
+def _load_queries():
+    # YAML registry is static per process
+    return load_queries()
+
+queries = _load_queries()
+_BY_NLQ = {}
+for _q in queries:
+    _BY_NLQ.setdefault(_q["natural_language_question"], _q)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _cached_query(sql: str, params_tuple: tuple) -> pa.Table:
+    # Re-renders with unchanged SQL + params skip the DB round-trip;
+    # Arrow goes straight to st.dataframe without a pandas pass
+    return run_query_arrow(sql, params=dict(params_tuple))
 
 st.title("FXLens")
 
@@ -36,13 +51,13 @@ if mode == "Predefined query":
     choice = st.selectbox("Select a question", qlist)
 
     if st.button("Run Predefined Query"):
-        selected = next(q for q in queries if q["natural_language_question"] == choice)
+        selected = _BY_NLQ[choice]
         sql = selected["sql"]
 
         st.write("📊 Results:")
         try:
-            df = run_query(sql, params=params)
-            st.dataframe(df)
+            tbl = _cached_query(sql, tuple(sorted(params.items())))
+            st.dataframe(tbl)
         except Exception as e:
             st.error(f"Error running query: {e}")
 
@@ -59,7 +74,7 @@ elif mode == "Ask Atlas":
         else:
             st.write("📊 Results:")
             try:
-                df = run_query(sql, params=params)
-                st.dataframe(df)
+                tbl = _cached_query(sql, tuple(sorted(params.items())))
+                st.dataframe(tbl)
             except Exception as e:
                 st.error(f"Error running query: {e}")
@@ -7,6 +7,12 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List, Any
 from dotenv import load_dotenv
+from app.services.sql_guard import safe_select
+
+try:
+    from yaml import CSafeLoader as _YamlLoader  # libyaml-backed, much faster
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
 # -------------------- ENV --------------------
 load_dotenv()  # loads .env in the project root if present
@@ -38,11 +44,16 @@ if not os.path.exists(QUERIES_REGISTRY_FILE):
     raise FileNotFoundError(f"{QUERIES_REGISTRY_FILE} not found in {os.path.dirname(__file__)}")
 
 with open(QUERIES_REGISTRY_FILE, "r", encoding="utf-8") as f:
-    queries_registry = yaml.safe_load(f)
+    queries_registry = yaml.load(f, Loader=_YamlLoader)
 
 if not isinstance(queries_registry, list):
     raise RuntimeError("queries_registry.yml must be a YAML list of entries.")
 
+# O(1) case-insensitive lookup by question (first entry wins on duplicates)
+_REGISTRY_BY_NLQ = {}
+for _entry in queries_registry:
+    _REGISTRY_BY_NLQ.setdefault(_entry.get("natural_language_question", "").strip().lower(), _entry)
+
 # -------------------- MODELS --------------------
 class QuestionRequest(BaseModel):
     question: str
@@ -67,14 +78,17 @@ def run_sql(sql: str) -> dict:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+_SELECT_RE = re.compile(r"^\s*select\b", re.IGNORECASE)
+_BANNED_RE = re.compile(
+    r"\b(insert|update|delete|drop|alter|create|truncate|grant|revoke|copy|do|call)\b",
+    re.IGNORECASE,
+)
+
 def validate_read_only_sql(sql: str):
-    s = sql.strip().lower()
-    if not s.startswith("select"):
+    if not _SELECT_RE.match(sql):
         raise HTTPException(status_code=400, detail="Only SELECT queries are allowed.")
-    banned = [" insert ", " update ", " delete ", " drop ", " alter ", " create ",
-              " truncate ", " grant ", " revoke ", " copy ", " do ", " call "]
-    s_spaced = f" {s} "
-    if any(kw in s_spaced for kw in banned):
+    # One word-boundary scan; identifiers like create_ts don't match
+    if _BANNED_RE.search(sql):
         raise HTTPException(status_code=400, detail="Write/DDL statements are not allowed.")
     return True
 
@@ -143,6 +157,8 @@ def ask_lmstudio_generate(question: str) -> tuple[str, str, Optional[str]]:
         raise HTTPException(status_code=500, detail="Could not parse SQL code block from LM Studio response.")
     sql_code = sql_block.group(1).strip()
     sql_code = sql_code.split(";")[0].strip()  # first statement only
+    if safe_select(sql_code) is None:
+        raise HTTPException(status_code=500, detail="LM Studio returned SQL outside the allowed forex_bars SELECT.")
 
     # Interpretation
     i_match = re.search(r"^\s*Interpretation:\s*(.+)$", content, flags=re.IGNORECASE | re.MULTILINE)
@@ -170,42 +186,42 @@ def ask_query(req: QuestionRequest):
     q_in = req.question.strip()
 
     # 1) Exact match in YAML registry
-    for entry in queries_registry:
+    entry = _REGISTRY_BY_NLQ.get(q_in.lower())
+    if entry is not None:
         nlq = entry.get("natural_language_question", "").strip()
-        if q_in.lower() == nlq.lower():
-            sql = (entry.get("sql_query") or "").strip()
-
-            # 1a) Registry SQL present → run it
-            if sql:
-                sql = add_optional_limit(sql, req.limit)
-                validate_read_only_sql(sql)
-                result = run_sql(sql)
-                return {
-                    "source": "registry",
-                    "question": nlq,
-                    "columns": result["columns"],
-                    "rows": result["rows"],
-                    "interpretation": entry.get("business_interpretation", "No interpretation available."),
-                    "source_url": entry.get("source_url")
-                }
-
-            # 1b) Registry SQL missing → LM Studio fallback (keep registry interp/source if available)
-            sql_gen, interp, src_url = ask_lmstudio_generate(q_in)
-            sql_gen = add_optional_limit(sql_gen, req.limit)
-            validate_read_only_sql(sql_gen)
-            result = run_sql(sql_gen)
-            interpretation = entry.get("business_interpretation") or interp or "No interpretation available."
-            source_url = entry.get("source_url") or src_url
+        sql = (entry.get("sql_query") or "").strip()
+
+        # 1a) Registry SQL present → run it
+        if sql:
+            sql = add_optional_limit(sql, req.limit)
+            validate_read_only_sql(sql)
+            result = run_sql(sql)
             return {
-                "source": "registry_match_missing_sql_lmstudio_fallback",
+                "source": "registry",
                 "question": nlq,
-                "sql_generated": sql_gen,
                 "columns": result["columns"],
                 "rows": result["rows"],
-                "interpretation": interpretation,
-                "source_url": source_url
+                "interpretation": entry.get("business_interpretation", "No interpretation available."),
+                "source_url": entry.get("source_url")
             }
 
+        # 1b) Registry SQL missing → LM Studio fallback (keep registry interp/source if available)
+        sql_gen, interp, src_url = ask_lmstudio_generate(q_in)
+        sql_gen = add_optional_limit(sql_gen, req.limit)
+        validate_read_only_sql(sql_gen)
+        result = run_sql(sql_gen)
+        interpretation = entry.get("business_interpretation") or interp or "No interpretation available."
+        source_url = entry.get("source_url") or src_url
+        return {
+            "source": "registry_match_missing_sql_lmstudio_fallback",
+            "question": nlq,
+            "sql_generated": sql_gen,
+            "columns": result["columns"],
+            "rows": result["rows"],
+            "interpretation": interpretation,
+            "source_url": source_url
+        }
+
     # 2) No registry match → full LM Studio fallback
     sql_gen, interp, src_url = ask_lmstudio_generate(q_in)
     sql_gen = add_optional_limit(sql_gen, req.limit)